@@ -1,13 +1,24 @@
 import os
-import shutil
-from pathlib import Path
-import git
+import re
+import base64
+from pathlib import PurePosixPath
 from dotenv import load_dotenv
-import json
-import yaml
-from typing import List, Dict
+import orjson
+from typing import List, Dict, Optional, Set, Tuple
+import time
+import threading
+from datetime import datetime, timezone
+import asyncio
+import httpx
+import diskcache
 import requests
-import tempfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+import multiprocessing.pool
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
 from reporter import ScanReporter
 
 # Load environment variables
@@ -15,313 +26,791 @@ load_dotenv()
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 EXCLUDED_REPOS = os.getenv('EXCLUDED_REPOS', '').split(',')
 ORGANIZATION = os.getenv('ORGANIZATION')
+# scan_results.json (a single JSON array) is written alongside the NDJSON report
+# unless JSON_REPORT is set to false
+JSON_REPORT = os.getenv('JSON_REPORT', 'true').lower() in ('1', 'true', 'yes')
+
+# Scanning is I/O-bound; cap workers to stay clear of GitHub's secondary rate limits
+SCAN_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# Below this many files the process pool round trip costs more than parsing inline
+PARALLEL_PARSE_MIN_FILES = 16
+
+DEPENDENCY_FILES = {
+    'package.json': 'npm',
+    'yarn.lock': 'yarn',
+    'requirements.txt': 'python'
+}
+PRUNED_DIRS = {'.git', 'node_modules', 'venv', '.venv', '__pycache__', 'dist', 'build'}
+
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
+ADVISORY_BATCH_SIZE = 100  # Aliased lookups per GraphQL query
+ECOSYSTEMS = {
+    'npm': 'NPM',
+    'yarn': 'NPM',
+    'python': 'PIP'
+}
+ADVISORY_FIELDS = """
+    nodes {
+      severity
+      vulnerableVersionRange
+      firstPatchedVersion { identifier }
+      advisory { ghsaId summary permalink publishedAt }
+    }
+"""
+
+GITHUB_ADVISORIES_URL = 'https://api.github.com/advisories'
+CACHE_DIR = os.getenv('HAWKEYE_CACHE_DIR', '.hawkeye-cache')
+ADVISORY_CACHE_TTL = 6 * 3600
+CLEAN_PACKAGE_TTL = 7 * 24 * 3600  # Most lookups come back empty; keep those far longer
+ADVISORY_FEED_ETAG_KEY = 'advisory-feed-etag'
+ADVISORY_FEED_SYNCED_KEY = 'advisory-feed-synced-at'
+
+# Opened by open_caches() rather than at import, so parse workers started with
+# spawn or forkserver re-import this module without touching the cache directory
+# Advisory lookups keyed by ecosystem, package and version, shared across scans
+ADVISORY_CACHE: Optional[diskcache.Cache] = None
+# Packages with no known advisories in any version, keyed by ecosystem and name
+CLEAN_PACKAGES: Optional[diskcache.Cache] = None
+# ETags and bodies of listing pages for conditional requests; kept apart from
+# ADVISORY_CACHE so an advisory purge doesn't discard them
+ETAG_CACHE: Optional[diskcache.Cache] = None
+
+# Package name from a yarn.lock entry header, e.g. `lodash@^4.17.0, lodash@^4.17.21:`
+# or `"@babel/core@^7.0.0":`. Indented lines and comments never match.
+YARN_PACKAGE_RE = re.compile(rb'^"?((?:@[^/\s"]+/)?[^@\s"#][^@\n"]*)@', re.M)
+
+# Comments in requirements files, whole-line or trailing after whitespace
+REQUIREMENT_COMMENT_RE = re.compile(r'(^|\s)#.*$')
+# Backslash line continuations, as emitted by pip-compile --generate-hashes
+REQUIREMENT_CONTINUATION_RE = re.compile(r'\\\r?\n')
+# Per-requirement options such as --hash=... trailing the specifier
+REQUIREMENT_OPTIONS_RE = re.compile(r'\s+--.*$')
+
+RATE_LIMIT_FLOOR = 50  # Pause until the reset once fewer requests than this remain
+RETRY_ATTEMPTS = 6
+RETRY_STATUSES = [403, 429, 502, 503, 504]
+API_CONCURRENCY = 10  # In-flight async requests across every scan thread
+ASYNC_LIMITS = httpx.Limits(max_connections=16)
+
+# Request headers shared by every GitHub call
+GITHUB_HEADERS = {
+    'Authorization': f'token {GITHUB_TOKEN}',
+    'Accept': 'application/vnd.github+json'
+}
+GRAPHQL_HEADERS = {
+    'Authorization': f'bearer {GITHUB_TOKEN}',
+    'Content-Type': 'application/json'
+}
+
+# Shared session so every GitHub call reuses pooled connections and
+# retries transient failures and secondary rate limits with backoff
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=RETRY_ATTEMPTS,
+        backoff_factor=1,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
+
+class AsyncGitHubClient:
+    """One event loop thread, HTTP/2 client and request cap shared by every scan thread
+
+    Scan threads hand coroutines to run(), so API_CONCURRENCY bounds the whole
+    scan and GraphQL lookups reuse a single kept-alive connection.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='github-async', daemon=True)
+        self.thread.start()
+        self.client, self.semaphore = self.run(self._open())
+        # Advisory lookups in flight, by package key. Only touched from the loop
+        # thread, so claiming and resolving them needs no lock
+        self.lookups: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    async def _open() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        # Created on the loop thread so both are bound to the shared loop
+        return _async_client(), asyncio.Semaphore(API_CONCURRENCY)
+
+    def run(self, coro):
+        """Run a coroutine on the shared loop and block the calling thread for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self) -> None:
+        self.run(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self) -> 'AsyncGitHubClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class ParsePool:
+    """Process pool for dependency parsing, started the first time a repository needs it
+
+    Most organizations never reach PARALLEL_PARSE_MIN_FILES in any repository,
+    so they never pay to start the workers.
+    """
+    def __init__(self):
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> multiprocessing.pool.Pool:
+        with self._lock:
+            if self._pool is None:
+                # Scan, render and event loop threads are already running, so
+                # spawn fresh workers instead of forking this process
+                self._pool = multiprocessing.get_context('spawn').Pool()
+            return self._pool
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
 
 class DependencyScanner:
-    def __init__(self, repo_url: str, repo_name: str):
-        self.repo_url = repo_url
+    def __init__(self, repo_url: str, repo_name: str, ref: str):
+        self.repo_url = repo_url  # GitHub API URL of the repository
         self.repo_name = repo_name
-        self.repo_path = None
-        self.package_managers = {}  # Store package manager per directory
+        self.ref = ref
+        self.tree_paths = set()  # Every file path in the repository tree
+        self.file_contents = {}  # Raw bytes of fetched dependency files by path
+        self.package_managers = {}  # (package manager, parsed package.json) per directory
+        # Unique dependencies per package manager: name -> {paths: [{path, version}]}
         self.dependencies = {
-            'npm': [],
-            'yarn': [],
-            'python': []
+            'npm': {},
+            'yarn': {},
+            'python': {}
         }
 
-    def detect_package_manager(self, directory: Path) -> str:
-        """Detect which package manager is being used in a specific directory"""
-        try:
-            if not directory.exists():
-                return None
+    def detect_package_manager(self, directory: PurePosixPath) -> Tuple[str, Optional[Dict]]:
+        """Detect which package manager is being used in a specific directory
 
-            yarn_lock = directory / 'yarn.lock'
-            package_lock = directory / 'package-lock.json'
-            package_json = directory / 'package.json'
+        Returns the package manager along with the parsed package.json when it
+        had to be read, so parsing can reuse it instead of decoding it again.
+        """
+        try:
+            yarn_lock = str(directory / 'yarn.lock')
+            package_lock = str(directory / 'package-lock.json')
+            package_json = str(directory / 'package.json')
 
-            if yarn_lock.exists():
+            if yarn_lock in self.tree_paths:
                 print(f"Found yarn.lock in {directory}")
-                return 'yarn'
-            elif package_lock.exists():
+                return 'yarn', None
+            elif package_lock in self.tree_paths:
                 print(f"Found package-lock.json in {directory}")
-                return 'npm'
-            elif package_json.exists():
+                return 'npm', None
+            elif package_json in self.tree_paths:
                 print(f"Found package.json in {directory}")
+                package_data = None
                 try:
-                    with open(package_json) as f:
-                        package_data = json.load(f)
-                        if 'packageManager' in package_data and 'yarn' in package_data['packageManager'].lower():
-                            return 'yarn'
+                    package_data = orjson.loads(self.file_contents[package_json])
+                    if 'packageManager' in package_data and 'yarn' in package_data['packageManager'].lower():
+                        return 'yarn', package_data
                 except Exception as e:
                     print(f"Error reading package.json in {directory}: {e}")
-                return 'npm'
-            return None
+                return 'npm', package_data
+            return None, None
         except Exception as e:
             print(f"Error detecting package manager in {directory}: {e}")
-            return None
+            return None, None
     
-    def parse_dependencies(self, file_info: Dict) -> None:
-        try:
-            file_path = Path(file_info['path'])
-            file_type = file_info['type']
-            directory = file_path.parent
-
-            print(f"Parsing dependencies from {file_path}")
-
-            if file_type in ['npm', 'yarn']:
+    def parse_dependencies(self, dependency_files: List[Dict],
+                           pool: Optional[multiprocessing.pool.Pool] = None) -> None:
+        """Parse dependency files, fanning out to the process pool when one is given"""
+        for file_info in dependency_files:
+            if file_info['type'] in ['npm', 'yarn']:
                 # Detect package manager for this directory if not already detected
+                directory = PurePosixPath(file_info['path']).parent
                 if directory not in self.package_managers:
                     self.package_managers[directory] = self.detect_package_manager(directory)
-                
-                package_manager = self.package_managers[directory]
-                if not package_manager:
-                    print(f"No package manager detected for {directory}")
-                    return
+                file_info['package_manager'], package_data = self.package_managers[directory]
+                if package_data is not None and file_info['type'] == 'npm':
+                    file_info['package_data'] = package_data
 
-                if file_path.name == 'package.json':
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if not content.strip():
-                                print(f"Empty package.json file in {directory}")
-                                return
-                            
-                            package_data = json.loads(content)
-                            if not isinstance(package_data, dict):
-                                print(f"Invalid package.json format in {directory}")
-                                return
-
-                            dependencies = {
-                                **package_data.get('dependencies', {}),
-                                **package_data.get('devDependencies', {})
-                            }
-
-                            if dependencies:
-                                self.dependencies[package_manager].extend([
-                                    {'name': name, 'version': version}
-                                    for name, version in dependencies.items()
-                                ])
-                                print(f"Successfully parsed {len(dependencies)} dependencies from package.json in {directory}")
-                            else:
-                                print(f"No dependencies found in package.json for {directory}")
-
-                    except json.JSONDecodeError as e:
-                        print(f"JSON parsing error in package.json for {directory}: {e}")
-                    except Exception as e:
-                        print(f"Unexpected error parsing package.json for {directory}: {e}")
-
-                elif file_path.name == 'yarn.lock':
-                    package_manager = self.package_managers.get(directory)
-                    if package_manager == 'yarn':
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                dependencies = []
-                                current_package = None
-                                
-                                for line in content.split('\n'):
-                                    line = line.strip()
-                                    if line.startswith('"'):
-                                        package_line = line.strip('"')
-                                        if '@' in package_line:
-                                            parts = package_line.split('@')
-                                            if parts[0].startswith('@'):
-                                                # Scoped package
-                                                current_package = '@' + parts[1].split(',')[0]
-                                            else:
-                                                current_package = parts[0]
-                                            
-                                            if current_package and current_package not in dependencies:
-                                                dependencies.append(current_package)
-
-                                self.dependencies['yarn'].extend([
-                                    {'name': dep, 'version': 'unknown'}
-                                    for dep in dependencies
-                                ])
-                                print(f"Successfully parsed {len(dependencies)} dependencies from yarn.lock")
-
-                        except Exception as e:
-                            print(f"Error parsing yarn.lock for {self.repo_name}: {e}")
-
-            elif file_type == 'python':
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        requirements = [
-                            line.strip()
-                            for line in f.readlines()
-                            if line.strip() and not line.startswith('#')
-                        ]
-                        self.dependencies['python'].extend([
-                            {'name': req, 'version': 'unknown'}
-                            for req in requirements
-                        ])
-                        print(f"Successfully parsed {len(requirements)} dependencies from requirements.txt")
+        if pool is not None:
+            partials = pool.imap_unordered(parse_one, dependency_files, chunksize=8)
+        else:
+            partials = map(parse_one, dependency_files)
 
-                except Exception as e:
-                    print(f"Error parsing requirements.txt for {self.repo_name}: {e}")
+        for partial, messages in partials:
+            for message in messages:
+                print(message)
+            for package_manager, deps in partial.items():
+                for name, dep in deps.items():
+                    merged = self.dependencies[package_manager].setdefault(name, {'paths': []})
+                    merged['paths'].extend(dep['paths'])
 
-        except Exception as e:
-            print(f"Error in parse_dependencies for {self.repo_name}: {e}")
+    async def check_vulnerabilities(self, api: AsyncGitHubClient):
+        """Check for vulnerabilities in dependencies, querying only advisories missing from the cache
 
-    def check_vulnerabilities(self):
-        """Check for vulnerabilities in dependencies"""
-        headers = {
-            'Authorization': f'token {GITHUB_TOKEN}',
-            'Accept': 'application/vnd.github.v4+json'
-        }
+        Runs on the shared event loop. A package another scan is already looking
+        up is awaited rather than queried again, so each package is fetched once
+        per run however many repositories depend on it.
+        """
+        # Group by advisory ecosystem so npm and yarn share a single lookup per package
+        deps_by_ecosystem = {}
+        for dep_type, deps in self.dependencies.items():
+            for dep_name, dep in deps.items():
+                packages = deps_by_ecosystem.setdefault(ECOSYSTEMS[dep_type], {})
+                packages.setdefault(dep_name, []).append((dep_type, dep))
+
+        # Skip known clean packages, serve the rest from the cache and batch up the misses
+        advisories = {}
+        batches = []
+        pending = {}  # Lookups started by other scans, by (ecosystem, name)
+        for ecosystem, packages in deps_by_ecosystem.items():
+            misses = []
+            for dep_name, occurrences in packages.items():
+                package_key = _package_key(ecosystem, dep_name)
+                if package_key in CLEAN_PACKAGES:
+                    continue
+
+                keys = [
+                    _advisory_cache_key(ecosystem, dep_name, version)
+                    for _, dep in occurrences
+                    for version in _paths_by_version(dep)
+                ]
+                cached = [(key, ADVISORY_CACHE.get(key)) for key in keys]
+                if all(vulns is not None for _, vulns in cached):
+                    advisories.update(cached)
+                elif package_key in api.lookups:
+                    pending[(ecosystem, dep_name)] = api.lookups[package_key]
+                else:
+                    api.lookups[package_key] = asyncio.get_running_loop().create_future()
+                    misses.append(dep_name)
+
+            for start in range(0, len(misses), ADVISORY_BATCH_SIZE):
+                batches.append((ecosystem, misses[start:start + ADVISORY_BATCH_SIZE]))
+
+        try:
+            results = await asyncio.gather(*[
+                self._query_advisories(api, ecosystem, batch)
+                for ecosystem, batch in batches
+            ])
+
+            for (ecosystem, batch), data in zip(batches, results):
+                for index, dep_name in enumerate(batch):
+                    result = data.get(f'p{index}')
+                    vulns = None if result is None else result.get('nodes', [])
+                    self._record_advisories(ecosystem, dep_name, deps_by_ecosystem, vulns, advisories)
+                    api.lookups.pop(_package_key(ecosystem, dep_name)).set_result(vulns)
+        finally:
+            # Release anything still claimed so waiting scans fall back to no result
+            for ecosystem, batch in batches:
+                for dep_name in batch:
+                    lookup = api.lookups.pop(_package_key(ecosystem, dep_name), None)
+                    if lookup is not None:
+                        lookup.set_result(None)
+
+        for (ecosystem, dep_name), lookup in pending.items():
+            vulns = await asyncio.shield(lookup)
+            self._record_advisories(ecosystem, dep_name, deps_by_ecosystem, vulns, advisories)
 
         vulnerabilities = []
-        
-        for dep_type, deps in self.dependencies.items():
-            if not deps:  # Skip empty dependency lists
-                continue
-                
-            for dep in deps:
-                dep_name = dep['name']
-                
-                response = requests.get(
-                    f'https://api.github.com/advisories',
-                    headers=headers,
-                    params={'package': dep_name}
-                )
-                
-                if response.status_code == 200:
-                    vulns = response.json()
-                    if vulns:
-                        # Use the actual dependency type instead of trying to access package_manager
+
+        for ecosystem, packages in deps_by_ecosystem.items():
+            for dep_name, occurrences in packages.items():
+                for dep_type, dep in occurrences:
+                    # One entry per declared version, listing only the files that pin it
+                    for version, paths in _paths_by_version(dep).items():
+                        vulns = advisories.get(_advisory_cache_key(ecosystem, dep_name, version))
+                        if not vulns:
+                            continue
+
                         vulnerabilities.append({
                             'dependency': dep_name,
                             'type': dep_type,
-                            'version': dep.get('version', 'unknown'),
+                            'version': version,
+                            'paths': paths,
                             'vulnerabilities': vulns
                         })
 
         return vulnerabilities
-    
-    def clone_repository(self, target_dir: str) -> None:
-        """Clone the repository to analyze"""
+
+    def _record_advisories(self, ecosystem: str, dep_name: str, deps_by_ecosystem: Dict,
+                           vulns: Optional[List[Dict]], advisories: Dict) -> None:
+        """Cache a package's lookup result for every version this repository declares"""
+        if vulns is None:  # Failed lookups are not cached
+            return
+
+        package_key = _package_key(ecosystem, dep_name)
+        if not vulns:
+            CLEAN_PACKAGES.set(package_key, True, expire=CLEAN_PACKAGE_TTL)
+            return
+
+        for _, dep in deps_by_ecosystem[ecosystem][dep_name]:
+            for version in _paths_by_version(dep):
+                key = _advisory_cache_key(ecosystem, dep_name, version)
+                advisories[key] = vulns
+                ADVISORY_CACHE.set(key, vulns, expire=ADVISORY_CACHE_TTL, tag=package_key)
+
+    async def _query_advisories(self, api: AsyncGitHubClient, ecosystem: str, batch: List[str]) -> Dict:
+        """Run one aliased advisory query and return its data keyed by alias"""
+        query, variables = _build_advisory_query(ecosystem, batch)
+
         try:
-            self.repo_path = Path(target_dir)
-            git.Repo.clone_from(self.repo_url, target_dir)
-            print(f"Successfully cloned {self.repo_name}")
-        except git.GitCommandError as e:
-            print(f"Error cloning repository {self.repo_name}: {e}")
-            raise
-
-    def find_dependency_files(self) -> List[Dict]:
-        """Find all dependency files in the repository"""
+            response = await _gh_async_request(
+                api.client, api.semaphore, 'POST', GITHUB_GRAPHQL_URL,
+                headers=GRAPHQL_HEADERS,
+                json={'query': query, 'variables': variables}
+            )
+        except httpx.TransportError as e:
+            # Leave this batch uncached rather than failing the whole repository
+            print(f"Error fetching advisories for {self.repo_name}: {e!r}")
+            return {}
+
+        if response.status_code != 200:
+            print(f"Error fetching advisories for {self.repo_name}: {response.status_code}")
+            return {}
+
+        payload = response.json()
+        if payload.get('errors'):
+            print(f"GraphQL errors fetching advisories for {self.repo_name}: {payload['errors']}")
+
+        return payload.get('data') or {}
+
+    def list_dep_files_via_tree(self) -> List[Dict]:
+        """List dependency files via the Git Trees API and fetch their contents"""
+        response = _gh_get(
+            f'{self.repo_url}/git/trees/{self.ref}',
+            headers=GITHUB_HEADERS,
+            params={'recursive': 1}
+        )
+
+        if response.status_code == 409:  # Empty repository
+            print(f"Repository {self.repo_name} is empty")
+            return []
+        response.raise_for_status()
+
+        tree = response.json()
+        if tree.get('truncated'):
+            print(f"Warning: tree for {self.repo_name} was truncated, some dependency files may be missed")
+
+        blobs = [entry for entry in tree['tree'] if entry['type'] == 'blob']
+        self.tree_paths = {entry['path'] for entry in blobs}
+
         dependency_files = []
-        
-        for path in self.repo_path.rglob('*'):
-            if path.is_file():
-                if path.name in ['package.json', 'yarn.lock', 'requirements.txt']:
-                    dependency_files.append({
-                        'path': str(path),
-                        'type': self._get_file_type(path.name),
-                        'directory': str(path.parent)
-                    })
-        
+        for entry in blobs:
+            path = PurePosixPath(entry['path'])
+            # Manifests under vendored or generated directories are not the repository's own
+            if path.name not in DEPENDENCY_FILES or not PRUNED_DIRS.isdisjoint(path.parts[:-1]):
+                continue
+
+            file_type = self._get_file_type(path.name)
+
+            content = self._fetch_blob(entry['sha'])
+            self.file_contents[entry['path']] = content
+            dependency_files.append({
+                'path': entry['path'],
+                'type': file_type,
+                'directory': str(path.parent),
+                'content': content,
+                'repo_name': self.repo_name
+            })
+
+        print(f"Found {len(dependency_files)} dependency files in {self.repo_name}")
         return dependency_files
 
+    def _fetch_blob(self, sha: str) -> bytes:
+        """Fetch a file's raw contents by blob SHA"""
+        response = _gh_get(f'{self.repo_url}/git/blobs/{sha}', headers=GITHUB_HEADERS)
+        response.raise_for_status()
+        return base64.b64decode(response.json()['content'])
+
     def _get_file_type(self, filename: str) -> str:
         """Determine the type of dependency file"""
-        if filename == 'package.json':
-            return 'npm'
-        elif filename == 'yarn.lock':
-            return 'yarn'
-        elif filename == 'requirements.txt':
-            return 'python'
-        
-def get_organization_repos(org_name: str, token: str) -> List[Dict]:
-    """Fetch all repositories from the organization"""
-    headers = {
-        'Authorization': f'token {token}',
-        'Accept': 'application/vnd.github.v3+json'
-    }
-    
-    repos = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/orgs/{org_name}/repos',
-            headers=headers,
-            params={'page': page, 'per_page': 100}
-        )
+        return DEPENDENCY_FILES.get(filename)
         
+def parse_one(file_info: Dict) -> Tuple[Dict[str, Dict], List[str]]:
+    """Parse a single dependency file into {package_manager: {name: {paths: [{path, version}]}}}
+
+    Runs in pool worker processes, so it only depends on the contents of file_info.
+    Log lines are returned rather than printed: workers write straight to the
+    inherited stdout and would tear through the parent's live progress display.
+    """
+    dependencies = {}
+    messages = []
+    log = messages.append
+
+    def add_dependency(package_manager: str, name: str, version: str) -> None:
+        dep = dependencies.setdefault(package_manager, {}).setdefault(name, {'paths': []})
+        dep['paths'].append({'path': str(file_path), 'version': version})
+
+    try:
+        file_path = PurePosixPath(file_info['path'])
+        file_type = file_info['type']
+        content = file_info['content']
+        repo_name = file_info['repo_name']
+        directory = file_path.parent
+
+        log(f"Parsing dependencies from {file_path}")
+
+        if file_type in ['npm', 'yarn']:
+            package_manager = file_info.get('package_manager')
+            if not package_manager:
+                log(f"No package manager detected for {directory}")
+                return dependencies, messages
+
+            if file_path.name == 'package.json':
+                try:
+                    # Reuse the package.json already decoded during detection
+                    package_data = file_info.get('package_data')
+                    if package_data is None:
+                        if not content.strip():
+                            log(f"Empty package.json file in {directory}")
+                            return dependencies, messages
+
+                        package_data = orjson.loads(content)
+
+                    if not isinstance(package_data, dict):
+                        log(f"Invalid package.json format in {directory}")
+                        return dependencies, messages
+
+                    package_deps = {
+                        **package_data.get('dependencies', {}),
+                        **package_data.get('devDependencies', {})
+                    }
+
+                    if package_deps:
+                        for name, version in package_deps.items():
+                            add_dependency(package_manager, name, version)
+                        log(f"Successfully parsed {len(package_deps)} dependencies from package.json in {directory}")
+                    else:
+                        log(f"No dependencies found in package.json for {directory}")
+
+                except orjson.JSONDecodeError as e:
+                    log(f"JSON parsing error in package.json for {directory}: {e}")
+                except Exception as e:
+                    log(f"Unexpected error parsing package.json for {directory}: {e}")
+
+            elif file_path.name == 'yarn.lock':
+                if package_manager == 'yarn':
+                    try:
+                        # Ordered de-duplication of every entry header's package name
+                        package_names = dict.fromkeys(
+                            match.group(1).decode('utf-8')
+                            for match in YARN_PACKAGE_RE.finditer(content)
+                        )
+
+                        for name in package_names:
+                            add_dependency('yarn', name, 'unknown')
+                        log(f"Successfully parsed {len(package_names)} dependencies from yarn.lock")
+
+                    except Exception as e:
+                        log(f"Error parsing yarn.lock for {repo_name}: {e}")
+
+        elif file_type == 'python':
+            try:
+                requirements = []
+                text = REQUIREMENT_CONTINUATION_RE.sub(' ', content.decode('utf-8', errors='replace'))
+                for line in text.splitlines():
+                    line = REQUIREMENT_COMMENT_RE.sub('', line)
+                    line = REQUIREMENT_OPTIONS_RE.sub('', line).strip()
+                    if not line:
+                        continue
+                    try:
+                        requirements.append(Requirement(line))
+                    except InvalidRequirement:
+                        # Options, includes and editables name no package to look up
+                        if not line.startswith('-'):
+                            log(f"Skipping unparseable requirement in {file_path}: {line}")
+                        continue
+
+                for req in requirements:
+                    # Canonical names keep cache keys and advisory eviction consistent
+                    add_dependency('python', canonicalize_name(req.name), str(req.specifier) or 'unknown')
+                log(f"Successfully parsed {len(requirements)} dependencies from requirements.txt")
+
+            except Exception as e:
+                log(f"Error parsing requirements.txt for {repo_name}: {e}")
+
+    except Exception as e:
+        log(f"Error in parse_one for {file_info.get('repo_name')}: {e}")
+
+    return dependencies, messages
+
+def _paths_by_version(dep: Dict) -> Dict[str, List[str]]:
+    """Group a dependency's declaring files by the version each one pins"""
+    versions = {}
+    for declaration in dep['paths']:
+        versions.setdefault(declaration['version'], []).append(declaration['path'])
+    return versions
+
+def _rate_limit_delay(response) -> float:
+    """Seconds to wait before the next request, non-zero once the remaining budget runs low"""
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    if remaining is None or int(remaining) >= RATE_LIMIT_FLOOR:
+        return 0
+
+    delay = max(0, int(response.headers.get('X-RateLimit-Reset', 0)) - time.time()) + 1
+    print(f"GitHub rate limit nearly exhausted ({remaining} left), pausing for {delay:.0f} seconds")
+    return delay
+
+def _gh_get(url: str, **kwargs) -> requests.Response:
+    response = SESSION.get(url, **kwargs)
+    time.sleep(_rate_limit_delay(response))
+    return response
+
+def _async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=True, limits=ASYNC_LIMITS, timeout=30)
+
+async def _gh_async_request(client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                            method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request, retrying secondary rate limits and transient errors with backoff
+
+    Connection errors and timeouts are retried like the shared session does and
+    re-raised as httpx.TransportError once the attempts run out.
+    """
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            async with semaphore:
+                response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(2 ** attempt)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS - 1:
+            break
+        await asyncio.sleep(float(response.headers.get('Retry-After', 2 ** attempt)))
+
+    await asyncio.sleep(_rate_limit_delay(response))
+    return response
+
+def _package_key(ecosystem: str, name: str) -> str:
+    return f'{ecosystem}:{name}'
+
+def _advisory_cache_key(ecosystem: str, name: str, version: str) -> str:
+    return f'{_package_key(ecosystem, name)}:{version}'
+
+def open_caches() -> None:
+    """Open the on-disk caches under CACHE_DIR"""
+    global ADVISORY_CACHE, CLEAN_PACKAGES, ETAG_CACHE
+    ADVISORY_CACHE = diskcache.Cache(CACHE_DIR)
+    ADVISORY_CACHE.create_tag_index()  # Entries are tagged by package for targeted eviction
+    CLEAN_PACKAGES = diskcache.Cache(os.path.join(CACHE_DIR, 'clean'))
+    ETAG_CACHE = diskcache.Cache(os.path.join(CACHE_DIR, 'etags'))
+
+def refresh_advisory_cache() -> None:
+    """Evict cached packages affected by advisories published or updated since the last run"""
+    etag = ADVISORY_CACHE.get(ADVISORY_FEED_ETAG_KEY)
+    synced_at = ADVISORY_CACHE.get(ADVISORY_FEED_SYNCED_KEY)
+    checked_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    response = _gh_get(
+        GITHUB_ADVISORIES_URL,
+        headers={**GITHUB_HEADERS, 'If-None-Match': etag} if etag else GITHUB_HEADERS,
+        # Sorted by update time so the ETag also changes when an existing advisory
+        # is revised, matching the modified filter used for eviction
+        params={'per_page': 1, 'sort': 'updated'}
+    )
+
+    if response.status_code == 304:
+        return
+    if response.status_code != 200:
+        print(f"Error checking advisory feed: {response.status_code}")
+        return
+
+    if etag:
+        changed = _changed_advisory_packages(synced_at) if synced_at else None
+        if changed is None:
+            print("Advisory feed changed, clearing cached advisories")
+            ADVISORY_CACHE.clear()
+            CLEAN_PACKAGES.clear()
+        else:
+            print(f"Advisory feed changed, evicting {len(changed)} affected packages from the cache")
+            for package_key in changed:
+                ADVISORY_CACHE.evict(package_key)
+                CLEAN_PACKAGES.delete(package_key)
+
+    ADVISORY_CACHE.set(ADVISORY_FEED_ETAG_KEY, response.headers.get('ETag'))
+    ADVISORY_CACHE.set(ADVISORY_FEED_SYNCED_KEY, checked_at)
+
+def _changed_advisory_packages(since: str) -> Optional[Set[str]]:
+    """Package keys named by advisories modified since a timestamp, or None if the feed can't be read"""
+    packages = set()
+    url = GITHUB_ADVISORIES_URL
+    params = {'modified': f'>={since}', 'per_page': 100}
+
+    while url:
+        response = _gh_get(url, headers=GITHUB_HEADERS, params=params)
+        if response.status_code != 200:
+            print(f"Error fetching advisory changes: {response.status_code}")
+            return None
+
+        for advisory in response.json():
+            for vuln in advisory.get('vulnerabilities') or []:
+                package = vuln.get('package') or {}
+                if package.get('ecosystem') and package.get('name'):
+                    ecosystem = package['ecosystem'].upper()
+                    name = canonicalize_name(package['name']) if ecosystem == 'PIP' else package['name']
+                    packages.add(_package_key(ecosystem, name))
+
+        # Follow the cursor-based Link header; the next URL carries the query
+        url = response.links.get('next', {}).get('url')
+        params = None
+
+    return packages
+
+def _build_advisory_query(ecosystem: str, package_names: List[str]) -> Tuple[str, Dict]:
+    """Build one GraphQL query with an aliased securityVulnerabilities block per package"""
+    params = ', '.join(f'$p{i}: String!' for i in range(len(package_names)))
+    blocks = '\n'.join(
+        f'  p{i}: securityVulnerabilities(first: 5, ecosystem: {ecosystem}, package: $p{i}) {{{ADVISORY_FIELDS}  }}'
+        for i in range(len(package_names))
+    )
+    variables = {f'p{i}': name for i, name in enumerate(package_names)}
+    return f'query({params}) {{\n{blocks}\n}}', variables
+
+async def get_organization_repos(org_name: str, client: httpx.AsyncClient,
+                                 semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Fetch all repositories from the organization, requesting pages concurrently"""
+    url = f'https://api.github.com/orgs/{org_name}/repos'
+
+    async def fetch_page(page: int) -> Tuple[Optional[List[Dict]], int]:
+        """Fetch one page and the last page number, reusing the stored copy on 304 Not Modified"""
+        cache_key = f'{url}?page={page}'
+        cached = ETAG_CACHE.get(cache_key)
+        page_headers = {**GITHUB_HEADERS, 'If-None-Match': cached['etag']} if cached else GITHUB_HEADERS
+
+        try:
+            response = await _gh_async_request(
+                client, semaphore, 'GET', url,
+                headers=page_headers,
+                params={'page': page, 'per_page': 100}
+            )
+        except httpx.TransportError as e:
+            print(f"Error fetching repositories: {e!r}")
+            return None, page
+
+        if response.status_code == 304:
+            return cached['body'], cached['last_page']
         if response.status_code != 200:
             print(f"Error fetching repositories: {response.status_code}")
-            break
-            
+            return None, page
+
         page_repos = response.json()
-        if not page_repos:
-            break
-            
-        repos.extend(page_repos)
-        page += 1
+        last_url = response.links.get('last', {}).get('url')
+        last_page = int(httpx.URL(last_url).params.get('page', page)) if last_url else page
+        if 'ETag' in response.headers:
+            ETAG_CACHE.set(cache_key, {
+                'etag': response.headers['ETag'],
+                'body': page_repos,
+                'last_page': last_page
+            })
+        return page_repos, last_page
+
+    # The first page's Link header tells us how many pages remain
+    first_page_repos, last_page = await fetch_page(1)
+    if first_page_repos is None:
+        return []
+
+    pages = await asyncio.gather(*[fetch_page(page) for page in range(2, last_page + 1)])
+
+    repos = list(first_page_repos)
+    for page_repos, _ in pages:
+        if page_repos:
+            repos.extend(page_repos)
     
     return repos
 
-def scan_repository(repo_url: str, repo_name: str) -> Dict:
+def scan_repository(repo_url: str, repo_name: str, ref: str, api: AsyncGitHubClient,
+                    parse_pool: Optional[ParsePool] = None) -> Dict:
     """Scan a single repository and return results"""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        try:
-            scanner = DependencyScanner(repo_url, repo_name)
-            scanner.clone_repository(temp_dir)
-            
-            dependency_files = scanner.find_dependency_files()
-            for file_info in dependency_files:
-                scanner.parse_dependencies(file_info)
-            
-            vulnerabilities = scanner.check_vulnerabilities()
-            
-            return {
-                'repo_name': repo_name,
-                'dependencies': scanner.dependencies,
-                'vulnerabilities': vulnerabilities
-            }
-        except Exception as e:
-            print(f"Error scanning repository {repo_name}: {e}")
-            return {
-                'repo_name': repo_name,
-                'error': str(e)
-            }
+    try:
+        scanner = DependencyScanner(repo_url, repo_name, ref)
+        
+        dependency_files = scanner.list_dep_files_via_tree()
+        pool = None
+        if parse_pool is not None and len(dependency_files) >= PARALLEL_PARSE_MIN_FILES:
+            pool = parse_pool.get()
+        scanner.parse_dependencies(dependency_files, pool)
+        
+        vulnerabilities = api.run(scanner.check_vulnerabilities(api))
+        
+        return {
+            'repo_name': repo_name,
+            'dependencies': scanner.dependencies,
+            'vulnerabilities': vulnerabilities
+        }
+    except Exception as e:
+        print(f"Error scanning repository {repo_name}: {e}")
+        return {
+            'repo_name': repo_name,
+            'error': str(e)
+        }
 
 def main():
     if not all([GITHUB_TOKEN, ORGANIZATION]):
         print("Error: GitHub token and organization name are required.")
         return
 
+    open_caches()
     reporter = ScanReporter()
     reporter.print_header()
 
+    # Every API call in the run shares one event loop, connection pool and request cap
+    with AsyncGitHubClient() as api:
+        scan_organization(reporter, api)
+
+def scan_organization(reporter: ScanReporter, api: AsyncGitHubClient) -> None:
+    """Fetch the organization's repositories and scan them, streaming results to the report"""
     # Fetch all repositories from the organization
     reporter.console.print(f"\nFetching repositories from [bold]{ORGANIZATION}[/]...")
-    repos = get_organization_repos(ORGANIZATION, GITHUB_TOKEN)
+    repos = api.run(get_organization_repos(ORGANIZATION, api.client, api.semaphore))
     
     if not repos:
         reporter.console.print("[red]No repositories found or error fetching repositories.[/]")
         return
 
-    results = []
-    with reporter.create_progress_bar() as progress:
-        scan_task = progress.add_task(
-            "Scanning repositories...", 
-            total=len(repos), 
-            status="Starting"
-        )
+    refresh_advisory_cache()
 
-        for repo in repos:
-            if repo['name'] in EXCLUDED_REPOS:
-                progress.update(scan_task, advance=1, status=f"Skipped {repo['name']}")
-                continue
+    excluded = [repo for repo in repos if repo['name'] in EXCLUDED_REPOS]
+    repos_to_scan = [repo for repo in repos if repo['name'] not in EXCLUDED_REPOS]
+    json_report = 'scan_results.json' if JSON_REPORT else None
+    if not JSON_REPORT:
+        reporter.console.print("[yellow]JSON_REPORT is off: scan_results.json will not be written, only scan_results.ndjson[/]")
+    with reporter.stream_detailed_report('scan_results.ndjson', json_report) as write_result:
+        with ParsePool() as parse_pool, reporter.create_progress_bar() as progress:
+            scan_task = progress.add_task(
+                "Scanning repositories...", 
+                total=len(repos), 
+                completed=len(excluded),
+                status=f"Skipped {len(excluded)} excluded" if excluded else "Starting"
+            )
 
-            progress.update(scan_task, status=f"Scanning {repo['name']}")
-            result = scan_repository(repo['clone_url'], repo['name'])
-            results.append(result)
-            progress.update(scan_task, advance=1)
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+                futures = {
+                    executor.submit(
+                        scan_repository, repo['url'], repo['name'], repo['default_branch'], api, parse_pool
+                    ): index
+                    for index, repo in enumerate(repos_to_scan)
+                }
+                # Only this thread touches the progress bar; the render thread
+                # repaints it on its own schedule instead of on every update
+                for future in as_completed(futures):
+                    index = futures[future]
+                    result = future.result()
+                    # Only the compact summary outlives this iteration
+                    write_result(result)
+                    reporter.record_result(index, result)
+                    progress.update(scan_task, advance=1, status=f"Scanned {repos_to_scan[index]['name']}")
 
-    # Save and display results
-    reporter.save_detailed_report(results, 'scan_results.json')
-    reporter.print_final_summary(results)
+    # Display results
+    reporter.print_final_summary()
 
 if __name__ == "__main__":
     main()
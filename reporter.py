@@ -1,101 +1,125 @@
 # reporter.py
-from typing import Dict, List
-from rich.console import Console
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-from rich.panel import Panel
-from rich.text import Text
-from rich.tree import Tree
+from typing import TYPE_CHECKING, Dict, Tuple
 from datetime import datetime
-import json
+from contextlib import contextmanager
+import threading
+import orjson
+
+# Rich is imported inside the methods that render, keeping it off the startup path
+if TYPE_CHECKING:
+    from rich.progress import Progress
+    from rich.table import Table
+    from rich.tree import Tree
 
 class ScanReporter:
     def __init__(self):
+        from rich.console import Console
+
         self.console = Console()
         self.start_time = datetime.now()
+        # Compact per-repository summaries by scan order, so full results can be dropped
+        self.summaries = {}
 
     def print_header(self):
         """Print the scanner header"""
+        from rich.panel import Panel
+        from rich.text import Text
+
         self.console.print(Panel(
             Text("HawkEye Dependency Scanner", style="bold white", justify="center"),
             subtitle="Scanning repositories for vulnerabilities",
             style="blue",
         ))
 
-    def create_progress_bar(self) -> Progress:
+    def create_progress_bar(self) -> 'Progress':
         """Create and return a progress bar for repository scanning"""
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+
         return Progress(
             SpinnerColumn(),
             TextColumn("[bold blue]{task.description}"),
             BarColumn(complete_style="green", finished_style="green"),
             TaskProgressColumn(),
             "[bold]{task.fields[status]}",
-            console=self.console
+            console=self.console,
+            auto_refresh=True,
+            refresh_per_second=10  # Repaint at most this often, however many updates arrive
         )
 
-    def print_repo_summary(self, results: List[Dict]):
-        """Print a summary of scanned repositories"""
-        total_repos = len(results)
-        successful_scans = len([r for r in results if 'error' not in r])
-        failed_scans = total_repos - successful_scans
+    def record_result(self, index: int, result: Dict):
+        """Keep only what the final summary needs from one repository's result"""
+        if 'error' in result:
+            self.summaries[index] = {'repo_name': result['repo_name'], 'error': True}
+            return
 
-        summary_table = Table(show_header=False, box=None)
-        summary_table.add_row("Total Repositories Scanned:", f"[bold]{total_repos}[/]")
-        summary_table.add_row("Successful Scans:", f"[green]{successful_scans}[/]")
-        summary_table.add_row("Failed Scans:", f"[red]{failed_scans}[/]")
+        deps = result['dependencies']
+        self.summaries[index] = {
+            'repo_name': result['repo_name'],
+            'dependency_counts': (len(deps['npm']), len(deps['yarn']), len(deps['python'])),
+            'vulnerabilities': [(vuln['dependency'], vuln['type']) for vuln in result.get('vulnerabilities', [])]
+        }
 
-        self.console.print("\n[bold]Scan Summary[/]")
-        self.console.print(Panel(summary_table))
+    def _aggregate(self) -> Tuple['Table', 'Table', 'Tree', int]:
+        """Build every summary renderable in a single pass over the recorded summaries"""
+        from rich.table import Table
+        from rich.tree import Tree
 
-    def print_vulnerability_report(self, results: List[Dict]):
-        """Print detailed vulnerability report"""
+        dep_table = Table(
+            "Repository", "NPM", "Yarn", "Python",
+            title="Dependencies by Repository",
+            style="blue"
+        )
         vuln_tree = Tree("[bold]Vulnerability Report[/]")
 
+        failed_scans = 0
         total_vulnerabilities = 0
-        repos_with_vulns = 0
 
-        for result in results:
-            if 'error' in result:
+        for index in sorted(self.summaries):
+            summary = self.summaries[index]
+            if summary.get('error'):
+                failed_scans += 1
                 continue
 
-            repo_vulns = result.get('vulnerabilities', [])
+            dep_table.add_row(summary['repo_name'], *map(str, summary['dependency_counts']))
+
+            repo_vulns = summary['vulnerabilities']
             if repo_vulns:
-                repos_with_vulns += 1
                 total_vulnerabilities += len(repo_vulns)
                 repo_branch = vuln_tree.add(
-                    f"[yellow]{result['repo_name']}[/] ([red]{len(repo_vulns)} vulnerabilities[/])"
+                    f"[yellow]{summary['repo_name']}[/] ([red]{len(repo_vulns)} vulnerabilities[/])"
                 )
 
-                for vuln in repo_vulns:
-                    vuln_text = f"[red]{vuln['dependency']}[/] ({vuln['type']})"
+                for dependency, dep_type in repo_vulns:
+                    vuln_text = f"[red]{dependency}[/] ({dep_type})"
                     repo_branch.add(vuln_text)
 
+        total_repos = len(self.summaries)
+        summary_table = Table(show_header=False, box=None)
+        summary_table.add_row("Total Repositories Scanned:", f"[bold]{total_repos}[/]")
+        summary_table.add_row("Successful Scans:", f"[green]{total_repos - failed_scans}[/]")
+        summary_table.add_row("Failed Scans:", f"[red]{failed_scans}[/]")
+
+        return summary_table, dep_table, vuln_tree, total_vulnerabilities
+
+    def print_repo_summary(self, summary_table: 'Table'):
+        """Print a summary of scanned repositories"""
+        from rich.panel import Panel
+
+        self.console.print("\n[bold]Scan Summary[/]")
+        self.console.print(Panel(summary_table))
+
+    def print_vulnerability_report(self, vuln_tree: 'Tree', total_vulnerabilities: int):
+        """Print detailed vulnerability report"""
+        from rich.panel import Panel
+
         if total_vulnerabilities > 0:
             self.console.print("\n[bold red]⚠️  Vulnerabilities Found[/]")
             self.console.print(Panel(vuln_tree))
         else:
             self.console.print("\n[bold green]✓ No vulnerabilities found[/]")
 
-    def print_dependency_summary(self, results: List[Dict]):
+    def print_dependency_summary(self, dep_table: 'Table'):
         """Print summary of dependencies found"""
-        dep_table = Table(
-            "Repository", "NPM", "Yarn", "Python",
-            title="Dependencies by Repository",
-            style="blue"
-        )
-
-        for result in results:
-            if 'error' in result:
-                continue
-
-            deps = result['dependencies']
-            dep_table.add_row(
-                result['repo_name'],
-                str(len(deps['npm'])),
-                str(len(deps['yarn'])),
-                str(len(deps['python']))
-            )
-
         self.console.print("\n")
         self.console.print(dep_table)
 
@@ -104,17 +128,45 @@ class ScanReporter:
         duration = datetime.now() - self.start_time
         self.console.print(f"\n[bold]Total Scan Time:[/] {duration.total_seconds():.2f} seconds")
 
-    def save_detailed_report(self, results: List[Dict], output_file: str):
-        """Save detailed JSON report"""
-        with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
-        
+    @contextmanager
+    def stream_detailed_report(self, output_file: str, json_output_file: str = None):
+        """Stream results into an NDJSON report as each repository finishes scanning
+
+        Yields a thread-safe callable that appends one result per line. If
+        json_output_file is given, the finished report is also converted into
+        a single JSON array for consumers that need one.
+        """
+        lock = threading.Lock()
+        with open(output_file, 'wb') as f:
+            def write_result(result: Dict):
+                line = orjson.dumps(result) + b'\n'
+                with lock:
+                    f.write(line)
+
+            yield write_result
+
         self.console.print(f"\n[bold green]Detailed report saved to:[/] {output_file}")
 
-    def print_final_summary(self, results: List[Dict]):
-        """Print the final summary of the scan"""
+        if json_output_file:
+            self.convert_report_to_json(output_file, json_output_file)
+            self.console.print(f"[bold green]JSON report saved to:[/] {json_output_file}")
+
+    def convert_report_to_json(self, ndjson_file: str, output_file: str):
+        """Convert an NDJSON report into a JSON array one line at a time"""
+        with open(ndjson_file, 'rb') as src, open(output_file, 'wb') as dst:
+            dst.write(b'[')
+            for index, line in enumerate(src):
+                if index:
+                    dst.write(b',')
+                dst.write(b'\n' + line.rstrip(b'\n'))
+            dst.write(b'\n]\n')
+
+    def print_final_summary(self):
+        """Print the final summary of the scan from the recorded results"""
+        summary_table, dep_table, vuln_tree, total_vulnerabilities = self._aggregate()
+
         self.console.rule("[bold]Scan Complete")
-        self.print_repo_summary(results)
-        self.print_dependency_summary(results)
-        self.print_vulnerability_report(results)
+        self.print_repo_summary(summary_table)
+        self.print_dependency_summary(dep_table)
+        self.print_vulnerability_report(vuln_tree, total_vulnerabilities)
         self.print_scan_time()